@@ -1,25 +1,54 @@
+import hashlib
 import logging
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Union, Optional
+from typing import List, Optional, Tuple, Union
 import pandas as pd
 import numpy as np
-from scipy.stats import f_oneway
+from scipy.stats import f as f_distribution, f_oneway
+from statsmodels.sandbox.stats.multicomp import TukeyHSDResults
 from statsmodels.stats.multicomp import pairwise_tukeyhsd
 import matplotlib.pyplot as plt
 import matplotlib
-matplotlib.use('Agg')
-
 
 # Constants
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = PROJECT_DIR / "data"
+RESULTS_DIR = PROJECT_DIR / "results" / "visualizations"
 SUCCESS_THRESHOLD = 2  # Used for ILAE success definition
 P_VALUE_THRESHOLD = 0.10  # For significance testing
+AGE_ORDER = ["Less than 1", "1 to 2", "3 to 4", "5 to 7", "8 to 10", "11 to 14",
+             "15 to 19", "20 to 24", "25 to 29", "30 to 34", "35 to 39", "Over 40"]  # Binned_Onset_Age labels, youngest first
+YEARS = tuple(f"Year {i}" for i in range(1, 6))  # x-axis labels of the per-year plots
+CHILDREN_BINS = 6  # The first AGE_ORDER bins (onset before 15) are children
+USE_COLS = (["Binned_Onset_Age"] + [f"ILAE_Year{year}" for year in range(1, 6)]
+            + [f"Success_Year{year}" for year in range(1, 6)])  # Columns used by the analysis
+CSV_DTYPES = {"Binned_Onset_Age": "category", **{f"ILAE_Year{year}": "Int8" for year in range(1, 6)}}
+# Part of the Parquet cache file name, so caches written with other columns or dtypes are never read
+CACHE_TAG = hashlib.sha1(repr((USE_COLS, CSV_DTYPES)).encode()).hexdigest()[:8]
+
+
+def _configure():
+    """Select the non-interactive matplotlib backend and configure logging.
+
+    Kept out of module import so that importing the analysis functions stays cheap.
+    """
+    matplotlib.use('Agg')
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 def load_dataset(file_path: Union[str, Path]) -> pd.DataFrame:
     """Load the dataset from a CSV file.
 
+    Only the USE_COLS columns are read, with the compact CSV_DTYPES types, using the
+    multi-threaded pyarrow CSV reader when available. The parsed CSV is cached as a
+    Parquet file next to the source, tagged with CACHE_TAG, and later calls read the
+    cache instead while it is newer than the CSV. Caching is best effort: without a
+    Parquet engine (pyarrow or fastparquet) or a writable directory the CSV is parsed
+    on every call.
+
     Args:
         file_path (Union[str, Path]): Path to the dataset file.
 
@@ -33,8 +62,25 @@ def load_dataset(file_path: Union[str, Path]) -> pd.DataFrame:
     file_path = Path(file_path).resolve()
     if not file_path.exists():
         raise FileNotFoundError(f"File not found: {file_path}")
-    
-    data = pd.read_csv(file_path)
+
+    cache_path = file_path.with_suffix(f".{CACHE_TAG}.parquet")
+    if cache_path.exists() and cache_path.stat().st_mtime >= file_path.stat().st_mtime:
+        data = pd.read_parquet(cache_path)
+    else:
+        header = pd.read_csv(file_path, nrows=0).columns
+        usecols = [col for col in header if col in USE_COLS]
+        try:
+            data = pd.read_csv(file_path, usecols=usecols, dtype=CSV_DTYPES, engine="pyarrow")
+        except ImportError:
+            data = pd.read_csv(file_path, usecols=usecols, dtype=CSV_DTYPES)
+        if not data.empty:
+            try:
+                data.to_parquet(cache_path, compression="snappy")
+            except ImportError:
+                logging.info("No Parquet engine available, dataset will not be cached.")
+            except OSError as e:
+                cache_path.unlink(missing_ok=True)  # Never leave a partial cache behind
+                logging.info(f"Could not write dataset cache, dataset will not be cached: {e}")
     if data.empty:
         raise ValueError(f"File is empty: {file_path}")
 
@@ -54,6 +100,23 @@ def define_success(ilae_score: Optional[float]) -> Optional[int]:
         return np.nan
     return 1 if ilae_score <= SUCCESS_THRESHOLD else 0
 
+def add_success_columns(data: pd.DataFrame) -> List[str]:
+    """Add a Success_YearX column for every available ILAE_YearX column.
+
+    Vectorized equivalent of applying define_success to each ILAE column.
+
+    Args:
+        data (pd.DataFrame): DataFrame with ILAE_YearX columns, modified in place.
+
+    Returns:
+        List[str]: Names of the added success columns.
+    """
+    ilae_cols = [f"ILAE_Year{year}" for year in range(1, 6) if f"ILAE_Year{year}" in data.columns]
+    success_cols = [col.replace("ILAE", "Success") for col in ilae_cols]
+    ilae = data[ilae_cols]
+    data[success_cols] = (ilae <= SUCCESS_THRESHOLD).astype("Int8").mask(ilae.isna()).set_axis(success_cols, axis=1)
+    return success_cols
+
 def time_to_success(row: pd.Series) -> Optional[int]:
     """Calculate time to success based on Success_Year columns.
 
@@ -64,10 +127,52 @@ def time_to_success(row: pd.Series) -> Optional[int]:
         Optional[int]: Year of first success or NaN if none.
     """
     for year in range(1, 6):
-        if row.get(f"Success_Year{year}") == 1:
+        value = row.get(f"Success_Year{year}")
+        if pd.notna(value) and value == 1:
             return year
     return np.nan
 
+def _first_success(sc: np.ndarray) -> np.ndarray:
+    """Scan each row of an int8 success matrix (-1 for missing) for the first success year, 0 if none."""
+    out = np.zeros(sc.shape[0], np.int8)
+    for i in range(sc.shape[0]):
+        for year in range(sc.shape[1]):
+            if sc[i, year] == 1:
+                out[i] = year + 1
+                break
+    return out
+
+
+@lru_cache(maxsize=None)
+def _compiled_first_success():
+    """Compile _first_success with numba on first use, numba is an optional dependency."""
+    from numba import njit
+    return njit(cache=True)(_first_success)
+
+
+def first_success_year(success: np.ndarray, use_numba: bool = False) -> np.ndarray:
+    """Vectorized time_to_success over a whole success matrix.
+
+    Uses an argmax over the boolean success matrix by default. With use_numba the
+    rows are scanned by a numba-compiled kernel instead, which pays a compile (or
+    cache load) on first use and only helps on very large matrices.
+
+    Args:
+        success (np.ndarray): (N, years) matrix of Success_YearX values, NaN for missing.
+        use_numba (bool): Use the numba kernel, requires numba to be installed.
+
+    Returns:
+        np.ndarray: Year of first success per row, NaN if none.
+    """
+    success = np.asarray(success)
+    if use_numba:
+        first = _compiled_first_success()(np.where(np.isnan(success), -1, success).astype(np.int8)).astype("float64")
+        first[first == 0] = np.nan
+        return first
+
+    mask = success == 1
+    return np.where(mask.any(axis=1), mask.argmax(axis=1) + 1, np.nan)
+
 def perform_anova(data: pd.DataFrame, group_col: str, value_col: str) -> Optional[float]:
     """Perform ANOVA test for a specified column grouped by another column.
 
@@ -80,10 +185,20 @@ def perform_anova(data: pd.DataFrame, group_col: str, value_col: str) -> Optiona
         Optional[float]: p-value of the ANOVA test, or None if insufficient data or invalid groups.
     """
     # Remove any rows where the value column is NaN
-    data = data.dropna(subset=[value_col])
-    
-    # Group the data by the specified column
-    groups = [group[value_col] for _, group in data.groupby(group_col)]
+    data = data[[group_col, value_col]].dropna(subset=[value_col])
+
+    # Integer group codes (-1 marks a missing group)
+    if isinstance(data[group_col].dtype, pd.CategoricalDtype):
+        codes = data[group_col].cat.codes.to_numpy()
+    else:
+        codes = pd.factorize(data[group_col])[0]
+    values = data[value_col].to_numpy(dtype="float64")[codes >= 0]
+    codes = codes[codes >= 0]
+
+    # Sort once by group code and split into views, one per group
+    order = np.argsort(codes, kind="stable")
+    values, codes = values[order], codes[order]
+    groups = np.split(values, np.flatnonzero(np.diff(codes)) + 1)
     
     # Check if there are enough groups with more than 1 value
     if len(groups) > 1 and all(len(group) > 1 for group in groups):
@@ -96,186 +211,290 @@ def perform_anova(data: pd.DataFrame, group_col: str, value_col: str) -> Optiona
     return None  # Not enough data or invalid groups for ANOVA
 
 
+def batched_anova(values: np.ndarray, codes: np.ndarray) -> np.ndarray:
+    """Perform one-way ANOVA for every column of a value matrix in a single pass.
+
+    Group sums and counts are accumulated with np.bincount, so the F statistic for
+    each column needs no per-group Python objects. The sums of squares are taken
+    around the group and overall means (two passes) to keep precision on values
+    far from zero.
+
+    Args:
+        values (np.ndarray): (N, k) matrix of values, NaN for missing entries.
+        codes (np.ndarray): (N,) integer group codes, negative codes are excluded.
+
+    Returns:
+        np.ndarray: p-value per column, NaN where the test cannot be computed
+            (fewer than two groups, or a group with a single value).
+    """
+    values = np.asarray(values)
+    codes = np.asarray(codes)
+    p_values = np.full(values.shape[1], np.nan)
+
+    for k in range(values.shape[1]):
+        column = values[:, k]
+        valid = ~np.isnan(column) & (codes >= 0)
+        g, y = codes[valid], column[valid].astype("float64")
+
+        counts = np.bincount(g)
+        present = counts > 0
+
+        # Same requirements as perform_anova
+        if present.sum() < 2 or (counts[present] < 2).any():
+            continue
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            means = np.bincount(g, weights=y) / counts
+        n_total, n_groups = len(y), present.sum()
+        ssb = (counts[present] * (means[present] - y.mean()) ** 2).sum()
+        ssw = ((y - means[g]) ** 2).sum()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            f_stat = (ssb / (n_groups - 1)) / (ssw / (n_total - n_groups))
+        p_values[k] = f_distribution.sf(f_stat, n_groups - 1, n_total - n_groups)
 
-def plot_success_rates(data: pd.DataFrame, group_col: str, success_cols: List[str], output_dir: Path):
+    return p_values
+
+
+
+def per_bin_stats(values: np.ndarray, codes: np.ndarray, n_groups: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Compute per-group sums and counts of non-NaN values with np.bincount.
+
+    Args:
+        values (np.ndarray): (N, k) matrix of values, NaN for missing entries.
+        codes (np.ndarray): (N,) integer group codes, negative codes belong to no group.
+        n_groups (int): Number of groups.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (sums, counts), each of shape (groups, k).
+    """
+    values = np.asarray(values)
+    shifted = np.asarray(codes) + 1  # Rows without a group (code -1) land in bin 0, which is dropped
+    present = ~np.isnan(values)
+    sums = np.zeros((n_groups, values.shape[1]))
+    counts = np.zeros((n_groups, values.shape[1]))
+
+    for k in range(values.shape[1]):
+        # NaN entries are weighted out instead of masked, to avoid copying each column
+        weights = np.where(present[:, k], values[:, k], 0)
+        sums[:, k] = np.bincount(shifted, weights=weights, minlength=n_groups + 1)[1:]
+        counts[:, k] = np.bincount(shifted, weights=present[:, k], minlength=n_groups + 1)[1:]
+    return sums, counts
+
+
+def plot_success_rates(bin_means: np.ndarray, group_labels: List[str], ax: plt.Axes, output_dir: Path):
     """Plot success rates over years by group.
 
     Args:
-        data (pd.DataFrame): DataFrame with success rates.
-        group_col (str): Grouping column.
-        success_cols (List[str]): Columns representing success rates.
+        bin_means (np.ndarray): (groups, years) matrix of average success rates.
+        group_labels (List[str]): Label of each group (row of bin_means).
+        ax (plt.Axes): Axes to draw on, cleared after saving so it can be reused.
         output_dir (Path): Directory to save the plot.
     """
-    # Calculate average success rate per group and per year
-    grouped = data.groupby(group_col)[success_cols].mean().T  # Transpose to have years as rows
-    grouped.index = [f"Year {i}" for i in range(1, len(success_cols) + 1)]  # Set the years dynamically
-    
-    # Plot the success rates
-    grouped.plot(kind="line", marker="o", figsize=(10, 6))
-    plt.title("Success Rates Over Years by Group", fontsize=16)
-    plt.xlabel("Years After Surgery", fontsize=14)
-    plt.ylabel("Success Rate", fontsize=14)
-    plt.legend(title="Age Groups", fontsize=12, bbox_to_anchor=(1.05, 1), loc="upper left")
-    plt.grid(axis="y", linestyle="--", alpha=0.7)
-    plt.tight_layout()
-    plt.savefig(output_dir / "success_rates_by_group.png")
-    plt.close()
-
-
-def plot_age_group_comparison(data: pd.DataFrame, success_cols: List[str], output_dir: Path):
+    years = YEARS[:bin_means.shape[1]]
+
+    # Plot the success rates, one line per group with data
+    for label, means in zip(group_labels, bin_means):
+        if not np.isnan(means).all():
+            ax.plot(years, means, marker="o", label=label)
+    ax.set_title("Success Rates Over Years by Group", fontsize=16)
+    ax.set_xlabel("Years After Surgery", fontsize=14)
+    ax.set_ylabel("Success Rate", fontsize=14)
+    ax.legend(title="Age Groups", fontsize=12, bbox_to_anchor=(1.05, 1), loc="upper left")
+    ax.grid(axis="y", linestyle="--", alpha=0.7)
+    ax.figure.savefig(output_dir / "success_rates_by_group.png", bbox_inches="tight")
+    ax.clear()
+
+
+def plot_age_group_comparison(children_avg: np.ndarray, adults_avg: np.ndarray, ax: plt.Axes, output_dir: Path):
     """Plot success trends for children vs adults with averaged trends.
 
     Args:
-        data (pd.DataFrame): DataFrame with success rates.
-        success_cols (List[str]): Columns representing success rates.
+        children_avg (np.ndarray): Average success rate of children for each year.
+        adults_avg (np.ndarray): Average success rate of adults for each year.
+        ax (plt.Axes): Axes to draw on, cleared after saving so it can be reused.
         output_dir (Path): Directory to save the plot.
     """
-    # Define the age groups
-    age_groups = {"Children": ["< 1", "1 to 2", "3-4", "5 to 7", "8-10", "11 to 14"],
-                  "Adults": ["15 to 19", "20 to 24", "25 to 29", "30 to 34", "35 to 39", "40 to 44", "45 to 49", "> 50"]}
+    years = YEARS[:len(children_avg)]
 
-    # Filter the data by age groups
-    children_data = data[data['Binned_Onset_Age'].isin(age_groups["Children"])]
-    adults_data = data[data['Binned_Onset_Age'].isin(age_groups["Adults"])]
-
-    # Calculate average success for each age group for each year
-    children_avg = children_data[success_cols].mean()
-    adults_avg = adults_data[success_cols].mean()
+    # Create the plot
+    ax.plot(years, children_avg, marker='o', label="Children", linewidth=2)
+    ax.plot(years, adults_avg, marker='o', label="Adults", linewidth=2)
+    ax.set_title("Average Success Rates: Children vs Adults", fontsize=16)
+    ax.set_xlabel("Years After Surgery", fontsize=14)
+    ax.set_ylabel("Average Success Rate", fontsize=14)
+    ax.legend(title="Group", fontsize=12, bbox_to_anchor=(1.05, 1), loc="upper left")
+    ax.grid(axis="y", linestyle="--", alpha=0.7)
+    ax.figure.savefig(output_dir / "success_rates_children_vs_adults.png", bbox_inches="tight")
+    ax.clear()
 
-    # Dynamically define years based on the available data in success_cols
-    years = [f"Year {i}" for i in range(1, len(success_cols) + 1)]
 
-    # Ensure the lengths of years and averages match
-    if len(children_avg) != len(years) or len(adults_avg) != len(years):
-        raise ValueError(f"Mismatch between the number of years ({len(years)}) and the number of success values ({len(children_avg)})")
 
-    # Create the plot
-    plt.figure(figsize=(10, 6))
-    plt.plot(years, children_avg, marker='o', label="Children", linewidth=2)
-    plt.plot(years, adults_avg, marker='o', label="Adults", linewidth=2)
-    plt.title("Average Success Rates: Children vs Adults", fontsize=16)
-    plt.xlabel("Years After Surgery", fontsize=14)
-    plt.ylabel("Average Success Rate", fontsize=14)
-    plt.legend(title="Group", fontsize=12, bbox_to_anchor=(1.05, 1), loc="upper left")
-    plt.grid(axis="y", linestyle="--", alpha=0.7)
-    plt.tight_layout()
-    plt.savefig(output_dir / "success_rates_children_vs_adults.png")
-    plt.close()
-    plt.close()
-
-
-
-def plot_avg_time_to_success(data: pd.DataFrame, group_col: str, time_col: str, output_dir: Path):
+def plot_avg_time_to_success(data: pd.DataFrame, group_col: str, time_col: str, ax: plt.Axes, output_dir: Path):
     """Plot the average time to success for each age group.
 
     Args:
         data (pd.DataFrame): DataFrame containing the data.
-        group_col (str): Column representing the age groups.
+        group_col (str): Categorical column representing the age groups.
         time_col (str): Column representing the time to success.
+        ax (plt.Axes): Axes to draw on, cleared after saving so it can be reused.
         output_dir (Path): Directory to save the plot.
     """
-    avg_time = data.groupby(group_col)[time_col].mean().dropna()
-    avg_time = avg_time.sort_index()
-
-    plt.figure(figsize=(10, 6))
-    avg_time.plot(kind="bar", color="skyblue", edgecolor="black")
-    plt.title("Average Time to Success by Age Group", fontsize=16)
-    plt.xlabel("Age Groups", fontsize=14)
-    plt.ylabel("Average Time to Success (Years)", fontsize=14)
-    plt.xticks(rotation=45, fontsize=12)
-    plt.grid(axis="y", linestyle="--", alpha=0.7)
-    plt.tight_layout()
-    plt.savefig(output_dir / "avg_time_to_success.png")
-    plt.close()
-
-def plot_tukey_test(data: pd.DataFrame, year_col: str, group_col: str, output_dir: Optional[Path] = None):
+    # Weighted bincount over the category codes gives every group mean in one pass
+    categories = data[group_col].cat.categories
+    codes = data[group_col].cat.codes.to_numpy()
+    t = data[time_col].to_numpy(dtype="float64")
+    valid = ~np.isnan(t) & (codes >= 0)
+    num = np.bincount(codes[valid], weights=t[valid], minlength=len(categories))
+    den = np.bincount(codes[valid], minlength=len(categories))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        avg_time = pd.Series(np.where(den > 0, num / den, np.nan), index=categories).dropna()
+
+    avg_time.plot(kind="bar", ax=ax, color="skyblue", edgecolor="black")
+    ax.set_title("Average Time to Success by Age Group", fontsize=16)
+    ax.set_xlabel("Age Groups", fontsize=14)
+    ax.set_ylabel("Average Time to Success (Years)", fontsize=14)
+    plt.setp(ax.get_xticklabels(), rotation=45, fontsize=12)
+    ax.grid(axis="y", linestyle="--", alpha=0.7)
+    ax.figure.savefig(output_dir / "avg_time_to_success.png", bbox_inches="tight")
+    ax.clear()
+
+def plot_tukey_test(endog: np.ndarray, groups: np.ndarray, year_col: str, group_col: str, ax: plt.Axes,
+                    output_dir: Optional[Path] = None) -> TukeyHSDResults:
     """Perform and plot Tukey's HSD test results.
 
     Args:
-        data (pd.DataFrame): DataFrame with the data.
-        year_col (str): Column representing the year.
-        group_col (str): Column representing the groups.
+        endog (np.ndarray): Values of the year column, without missing entries.
+        groups (np.ndarray): Group label of each value, without missing entries.
+        year_col (str): Name of the year column.
+        group_col (str): Name of the grouping column.
+        ax (plt.Axes): Axes to draw on, cleared after saving so it can be reused.
         output_dir (Optional[Path]): Directory to save the plot (optional, defaults to None).
+
+    Returns:
+        TukeyHSDResults: Result of the test, including its summary table.
     """
-    data = data[[group_col, year_col]].dropna()
-    tukey = pairwise_tukeyhsd(endog=data[year_col], groups=data[group_col], alpha=0.05)
+    tukey = pairwise_tukeyhsd(endog=endog, groups=groups, alpha=0.05)
     print(tukey.summary())
 
-    # Filter out nan values before plotting
-    tukey_results = tukey.summary().data[1:]  # Skip header row
-    tukey_results = [row for row in tukey_results if not any(pd.isna(val) for val in row[1:])]
+    # Only plot when some comparison has no nan values
+    valid = ~(np.isnan(tukey.meandiffs) | np.isnan(tukey.pvalues) | np.isnan(tukey.confint).any(axis=1))
 
-    if tukey_results:  # If there are valid results
-        tukey.plot_simultaneous(ylabel=group_col, xlabel="Mean Difference")
-        plt.title(f"Tukey HSD Test: {year_col}", fontsize=14)
-        plt.grid(axis="y", linestyle="--", alpha=0.7)
-        plt.tight_layout()
+    if valid.any():  # If there are valid results
+        tukey.plot_simultaneous(ax=ax, ylabel=group_col, xlabel="Mean Difference")
+        ax.set_title(f"Tukey HSD Test: {year_col}", fontsize=14)
+        ax.grid(axis="y", linestyle="--", alpha=0.7)
 
         # Save the plot only if output_dir is provided
         if output_dir is not None:
-            plt.savefig(output_dir / f"tukey_hsd_{year_col}.png")
+            ax.figure.savefig(output_dir / f"tukey_hsd_{year_col}.png", bbox_inches="tight")
         else:
             plt.show()  # If no output_dir, display the plot instead of saving it
-        plt.close()
+        ax.clear()
     else:
         print(f"No valid Tukey test results for {year_col}")
+    return tukey
+
+
+
+def analyze_year(values: np.ndarray, groups: np.ndarray, year_col: str, group_col: str) -> Optional[bytes]:
+    """Run Tukey's HSD test for one year, meant to be executed in a worker process.
+
+    The plot is rendered on a private figure into a temporary directory, and its bytes
+    are returned so that only the parent process writes to the results directory.
+
+    Args:
+        values (np.ndarray): Values of the year column, NaN for missing entries.
+        groups (np.ndarray): Group label of each value.
+        year_col (str): Name of the year column.
+        group_col (str): Name of the grouping column.
 
+    Returns:
+        Optional[bytes]: PNG image of the Tukey plot, or None if there were no valid results.
+    """
+    valid = ~np.isnan(values) & pd.notna(groups)
+    fig, ax = plt.subplots(figsize=(10, 6))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        plot_tukey_test(values[valid], np.asarray(groups[valid]), year_col, group_col, ax, Path(tmp_dir))
+        plt.close(fig)
+        plot_path = Path(tmp_dir) / f"tukey_hsd_{year_col}.png"
+        return plot_path.read_bytes() if plot_path.exists() else None
 
 
 def main():
     """Main function to execute the analysis pipeline."""
+    _configure()
     try:
-        # Define paths
-        data_dir = Path("C:/Users/ohadp/OneDrive/Desktop/PROJECTS/FinalProject/data").resolve()
-        results_dir = Path("C:/Users/ohadp/OneDrive/Desktop/PROJECTS/FinalProject/results/visualizations").resolve()
+        results_dir = RESULTS_DIR
         results_dir.mkdir(parents=True, exist_ok=True)
 
+        # One figure is reused by every plot, each plot clears its axes after saving
+        fig, ax = plt.subplots(figsize=(10, 6))
+
         # Load dataset
-        file_path = data_dir / "Metadata_Release_Anon.csv"
-        data = pd.read_csv(file_path)
+        file_path = DATA_DIR / "Metadata_Release_Anon.csv"
+        data = load_dataset(file_path)
+        data["Binned_Onset_Age"] = pd.Categorical(data["Binned_Onset_Age"], categories=AGE_ORDER, ordered=True)
+        codes = data["Binned_Onset_Age"].cat.codes.to_numpy()
+        is_child = (codes >= 0) & (codes < CHILDREN_BINS)  # code -1 marks a missing bin
+        is_adult = codes >= CHILDREN_BINS
 
         # Preprocess data
-        for year in range(1, 6):
-            col_name = f"ILAE_Year{year}"
-            success_col = f"Success_Year{year}"
-            if col_name in data.columns:
-                data[success_col] = data[col_name].apply(define_success)
+        add_success_columns(data)
+
+        # Extract the (N, years) success matrix once, missing year columns are all NaN
+        success_cols = [f"Success_Year{year}" for year in range(1, 6)]
+        succ_arr = data.reindex(columns=success_cols).to_numpy(dtype="float32", na_value=np.nan)
 
-        data["Time_to_Success"] = data.apply(time_to_success, axis=1)
+        # First year with success
+        data["Time_to_Success"] = first_success_year(succ_arr)
 
         # Perform visualizations
-        success_cols = [f"Success_Year{year}" for year in range(1, 6)]
-        plot_success_rates(data, "Binned_Onset_Age", success_cols, results_dir)
-        plot_age_group_comparison(data, success_cols, results_dir)
-        plot_avg_time_to_success(data, "Binned_Onset_Age", "Time_to_Success", results_dir)
+        sums, counts = per_bin_stats(succ_arr, codes, len(AGE_ORDER))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            bin_means = sums / counts
+            children_avg = sums[:CHILDREN_BINS].sum(axis=0) / counts[:CHILDREN_BINS].sum(axis=0)
+            adults_avg = sums[CHILDREN_BINS:].sum(axis=0) / counts[CHILDREN_BINS:].sum(axis=0)
+        plot_success_rates(bin_means, AGE_ORDER, ax, results_dir)
+        plot_age_group_comparison(children_avg, adults_avg, ax, results_dir)
+        plot_avg_time_to_success(data, "Binned_Onset_Age", "Time_to_Success", ax, results_dir)
 
         # Perform ANOVA for children vs adults for all years
-        age_groups = {
-            "Children": ["< 1", "1 to 2", "3-4", "5 to 7", "8-10", "11 to 14"],
-            "Adults": ["15 to 19", "20 to 24", "25 to 29", "30 to 34", "35 to 39", "40 to 44", "45 to 49", "> 50"]
-        }
-        children_data = data[data['Binned_Onset_Age'].isin(age_groups["Children"])]
-        adults_data = data[data['Binned_Onset_Age'].isin(age_groups["Adults"])]
-
-        for year_col in success_cols:
-            children_success = children_data[year_col].dropna()
-            adults_success = adults_data[year_col].dropna()
-
-            if len(children_success) > 1 and len(adults_success) > 1:
-                p_value = f_oneway(children_success, adults_success).pvalue
+        adult_codes = np.where(is_child, 0, np.where(is_adult, 1, -1))
+
+        tukey_years = []  # Years needing Tukey's HSD test, in order of discovery
+        for year_col, p_value in zip(success_cols, batched_anova(succ_arr, adult_codes)):
+            if not np.isnan(p_value):
                 logging.info(f"ANOVA p-value for Children vs Adults ({year_col}): {p_value}")
                 if p_value < P_VALUE_THRESHOLD:
                     logging.info(f"Significant difference found between Children and Adults for {year_col}. Performing Tukey's HSD test.")
-                    plot_tukey_test(data, year_col, "Binned_Onset_Age", results_dir)
+                    tukey_years.append(year_col)
 
         # Perform ANOVA and Tukey's HSD tests for all age groups
-        for year_col in success_cols:
-            p_value = perform_anova(data, "Binned_Onset_Age", year_col)
-            if p_value is not None:
+        for year_col, p_value in zip(success_cols, batched_anova(succ_arr, codes)):
+            if not np.isnan(p_value):
                 logging.info(f"ANOVA p-value for {year_col}: {p_value}")
                 if p_value < P_VALUE_THRESHOLD:
                     logging.info(f"Significant differences found for {year_col}, performing Tukey's HSD test.")
-                    plot_tukey_test(data, year_col, "Binned_Onset_Age", results_dir)
+                    tukey_years.append(year_col)
+
+        # Both comparisons plot the same Tukey test, so run each year once. Worker start-up
+        # (re-importing pandas/scipy/statsmodels under spawn) only pays off for several years.
+        tukey_years = list(dict.fromkeys(tukey_years))
+        groups = data["Binned_Onset_Age"].array
+        tukey_args = [(succ_arr[:, success_cols.index(year_col)], groups, year_col, "Binned_Onset_Age")
+                      for year_col in tukey_years]
+        if len(tukey_years) == 1:
+            tukey_plots = [analyze_year(*tukey_args[0])]
+        elif tukey_years:
+            with ProcessPoolExecutor(max_workers=len(tukey_years), initializer=_configure) as executor:
+                tukey_plots = list(executor.map(analyze_year, *zip(*tukey_args)))
+        else:
+            tukey_plots = []
+        for year_col, plot_bytes in zip(tukey_years, tukey_plots):
+            if plot_bytes is not None:
+                (results_dir / f"tukey_hsd_{year_col}.png").write_bytes(plot_bytes)
+
+        plt.close(fig)
 
     except Exception as e:
         logging.error(f"An error occurred: {e}")
@@ -4,11 +4,15 @@ import numpy as np
 from pathlib import Path
 import sys
 import os
-import matplotlib
-matplotlib.use('Agg')  # Disable GUI for testing
+import matplotlib.pyplot as plt
 
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), r"C:/Users/ohadp/OneDrive/Desktop/PROJECTS/FinalProject/src")))
-from DataAnalisys import define_success, time_to_success, perform_anova, load_dataset, plot_success_rates, plot_age_group_comparison, plot_tukey_test, plot_avg_time_to_success
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+from DataAnalisys import _configure, define_success, add_success_columns, time_to_success, first_success_year, perform_anova, batched_anova, load_dataset, per_bin_stats, plot_success_rates, plot_age_group_comparison, plot_tukey_test, plot_avg_time_to_success, analyze_year
+
+@pytest.fixture(autouse=True, scope="module")
+def configure() -> None:
+    """Disable GUI for testing and configure logging."""
+    _configure()
 
 @pytest.fixture
 def sample_data():
@@ -22,6 +26,13 @@ def sample_data():
         "Binned_Onset_Age": ["5 to 7", "8-10", "40 to 44", "20 to 24"]
     })
 
+@pytest.fixture
+def ax():
+    """Create a reusable Axes for the plotting tests."""
+    fig, ax = plt.subplots(figsize=(10, 6))
+    yield ax
+    plt.close(fig)
+
 # Test: define_success function
 def test_define_success() -> None:
     """Test the define_success function."""
@@ -29,6 +40,16 @@ def test_define_success() -> None:
     assert define_success(3) == 0
     assert np.isnan(define_success(np.nan))
 
+# Test: add_success_columns function
+def test_add_success_columns() -> None:
+    """Test that add_success_columns matches define_success cell by cell."""
+    data = pd.DataFrame({"ILAE_Year1": [1, 3, 2, np.nan], "ILAE_Year3": [4, 1, np.nan, 2]})
+    assert add_success_columns(data) == ["Success_Year1", "Success_Year3"]
+    for year in (1, 3):
+        expected = data[f"ILAE_Year{year}"].map(define_success)
+        result = data[f"Success_Year{year}"].astype("float64")
+        pd.testing.assert_series_equal(result, expected, check_names=False)
+
 # Test: time_to_success function
 def test_time_to_success(sample_data) -> None:
     """Test the time_to_success function."""
@@ -43,6 +64,63 @@ def test_missing_columns() -> None:
     data["Time_to_Success"] = data.apply(time_to_success, axis=1)
     assert data["Time_to_Success"].isna().sum() == 0  # Should not produce NaNs
 
+# Test: load_dataset function
+def test_load_dataset(tmp_path) -> None:
+    """Test that load_dataset returns the same frame on first and repeated loads."""
+    csv_path = tmp_path / "data.csv"
+    pd.DataFrame({"Sex": ["M", "F"], "Binned_Onset_Age": ["5 to 7", "Over 40"],
+                  "ILAE_Year1": [1, np.nan]}).to_csv(csv_path, index=False)
+    first = load_dataset(csv_path)
+    second = load_dataset(csv_path)  # Served from the Parquet cache when an engine is installed
+    assert list(first.columns) == ["Binned_Onset_Age", "ILAE_Year1"]  # Unused columns are not read
+    assert first["ILAE_Year1"].dtype == "Int8"
+    pd.testing.assert_frame_equal(first, second)
+
+# Test: load_dataset when the cache cannot be written
+def test_load_dataset_unwritable_cache(tmp_path, monkeypatch) -> None:
+    """Test that a failing cache write does not fail the load."""
+    csv_path = tmp_path / "data.csv"
+    pd.DataFrame({"Binned_Onset_Age": ["5 to 7"], "ILAE_Year1": [1]}).to_csv(csv_path, index=False)
+
+    def read_only(*args, **kwargs):
+        raise PermissionError("read-only directory")
+
+    monkeypatch.setattr(pd.DataFrame, "to_parquet", read_only)
+    assert load_dataset(csv_path)["ILAE_Year1"].tolist() == [1]
+
+# Test: load_dataset ignores caches written with another schema
+def test_load_dataset_stale_cache(tmp_path) -> None:
+    """Test that an untagged cache from an older column/dtype selection is not read."""
+    pytest.importorskip("pyarrow")
+    csv_path = tmp_path / "data.csv"
+    pd.DataFrame({"Sex": ["M"], "Binned_Onset_Age": ["5 to 7"], "ILAE_Year1": [1]}).to_csv(csv_path, index=False)
+    stale = pd.DataFrame({"Sex": ["M"], "Binned_Onset_Age": ["5 to 7"], "ILAE_Year1": np.array([1], dtype="float32")})
+    stale.to_parquet(tmp_path / "data.parquet")  # Newer than the CSV
+    data = load_dataset(csv_path)
+    assert list(data.columns) == ["Binned_Onset_Age", "ILAE_Year1"]
+    assert data["ILAE_Year1"].dtype == "Int8"
+
+# Test: load_dataset raises on missing files
+def test_load_dataset_missing_file(tmp_path) -> None:
+    """Test that load_dataset raises FileNotFoundError for a missing file."""
+    with pytest.raises(FileNotFoundError):
+        load_dataset(tmp_path / "missing.csv")
+
+# Test: first_success_year function
+def test_first_success_year(sample_data) -> None:
+    """Test that first_success_year matches time_to_success row by row."""
+    expected = sample_data.apply(time_to_success, axis=1).to_numpy(dtype=float)
+    result = first_success_year(sample_data[["Success_Year1", "Success_Year2"]].to_numpy(dtype=float))
+    np.testing.assert_array_equal(result, expected)
+    assert np.isnan(first_success_year(np.array([[0.0, np.nan]]))[0])
+
+# Test: first_success_year with the numba kernel
+def test_first_success_year_numba() -> None:
+    """Test that the numba branch of first_success_year matches the argmax branch."""
+    pytest.importorskip("numba")
+    success = np.array([[0, 1, 1], [np.nan, 0, 1], [0, 0, np.nan], [1, np.nan, 0]])
+    np.testing.assert_array_equal(first_success_year(success, use_numba=True), first_success_year(success))
+
 # Test: perform_anova function
 def test_perform_anova(sample_data) -> None:
     """Test the perform_anova function."""
@@ -54,32 +132,87 @@ def test_perform_anova(sample_data) -> None:
         # If ANOVA didn't return a p-value, skip the test or assert None
         pytest.skip("ANOVA returned None due to insufficient data or invalid groups.")
 
+# Test: perform_anova against scipy for categorical, object and missing groups
+@pytest.mark.parametrize("group_dtype", ["category", "object"])
+def test_perform_anova_matches_f_oneway(group_dtype) -> None:
+    """Test that perform_anova matches f_oneway and ignores rows without a group or value."""
+    from scipy.stats import f_oneway
+    data = pd.DataFrame({
+        "Group": ["b", "a", "b", "c", None, "a", "c", "b", "a", "c"],
+        "Value": [1.0, 0.0, 1.0, 0.0, 1.0, 1.0, np.nan, 0.0, 0.0, 1.0],
+    })
+    data["Group"] = data["Group"].astype(group_dtype)
+    expected = f_oneway([0.0, 1.0, 0.0], [1.0, 1.0, 0.0], [0.0, 1.0]).pvalue
+    assert np.isclose(perform_anova(data, "Group", "Value"), expected)
+
+# Test: batched_anova function
+def test_batched_anova() -> None:
+    """Test that batched_anova matches scipy's f_oneway per column."""
+    from scipy.stats import f_oneway
+    values = np.array([[1, 0], [0, 1], [1, 1], [0, np.nan], [1, 0], [1, 0], [1, 1]], dtype=float)
+    codes = np.array([0, 0, 1, 1, 2, 2, -1])
+    p_values = batched_anova(values, codes)
+    expected = f_oneway([1, 0], [1, 0], [1, 1]).pvalue
+    assert np.isclose(p_values[0], expected)
+    assert np.isnan(p_values[1])  # Group 1 has a single value in the second column
+
+# Test: batched_anova on non-binary data
+def test_batched_anova_large_values() -> None:
+    """Test that batched_anova keeps precision on values far from zero."""
+    from scipy.stats import f_oneway
+    rng = np.random.default_rng(0)
+    values = 1e8 + rng.normal(size=(60, 2))
+    codes = np.repeat([0, 1, 2], 20)
+    p_values = batched_anova(values, codes)
+    for k in range(2):
+        expected = f_oneway(*(values[codes == c, k] for c in range(3))).pvalue
+        assert np.isclose(p_values[k], expected)
+
+# Test: per_bin_stats function
+def test_per_bin_stats(sample_data) -> None:
+    """Test the per_bin_stats function."""
+    codes = np.array([0, 2, 2, 0])  # Groups 1 and 3 are empty
+    values = sample_data[["Success_Year1", "Success_Year2"]].to_numpy(dtype=float)
+    sums, counts = per_bin_stats(values, codes, 4)
+    assert sums.tolist() == [[1, 2], [0, 0], [1, 1], [0, 0]]
+    assert counts.tolist() == [[1, 2], [0, 0], [2, 2], [0, 0]]  # NaN values are not counted
+    sums, counts = per_bin_stats(values, np.array([0, -1, 1, 0]), 2)
+    assert counts.tolist() == [[1, 2], [1, 1]]  # Rows without a group are excluded
+
 # Test: plot_success_rates function
-def test_plot_success_rates(sample_data, tmp_path) -> None:
+def test_plot_success_rates(ax, tmp_path) -> None:
     """Test the plot_success_rates function."""
-    success_cols = ["Success_Year1", "Success_Year2"]
+    bin_means = np.array([[1.0, 0.5], [0.0, np.nan], [np.nan, np.nan]])
     output_dir = tmp_path  # Temporary directory for saving the plot
-    plot_success_rates(sample_data, "Binned_Onset_Age", success_cols, output_dir)
+    plot_success_rates(bin_means, ["5 to 7", "8-10", "40 to 44"], ax, output_dir)
+    assert (output_dir / "success_rates_by_group.png").exists()
 
 # Test: plot_age_group_comparison function
-def test_plot_age_group_comparison(sample_data, tmp_path) -> None:
+def test_plot_age_group_comparison(ax, tmp_path) -> None:
     """Test the plot_age_group_comparison function."""
-    success_cols = ["Success_Year1", "Success_Year2"]
+    children_avg = np.array([0.5, 1.0])
+    adults_avg = np.array([1.0, 0.5])
     output_dir = tmp_path  # Temporary directory for saving the plot
-    plot_age_group_comparison(sample_data, success_cols, output_dir)
+    plot_age_group_comparison(children_avg, adults_avg, ax, output_dir)
+    assert (output_dir / "success_rates_children_vs_adults.png").exists()
 
 # Test: plot_avg_time_to_success function
-def test_plot_avg_time_to_success(sample_data, tmp_path) -> None:
+def test_plot_avg_time_to_success(sample_data, ax, tmp_path) -> None:
     """Test the plot_avg_time_to_success function."""
     sample_data["Time_to_Success"] = sample_data.apply(time_to_success, axis=1)
+    sample_data["Binned_Onset_Age"] = pd.Categorical(sample_data["Binned_Onset_Age"])
     output_dir = tmp_path  # Temporary directory for saving the plot
-    plot_avg_time_to_success(sample_data, "Binned_Onset_Age", "Time_to_Success", output_dir)
+    plot_avg_time_to_success(sample_data, "Binned_Onset_Age", "Time_to_Success", ax, output_dir)
+    assert (output_dir / "avg_time_to_success.png").exists()
 
 # Test: plot_tukey_test function
-def test_plot_tukey_test(sample_data, tmp_path) -> None:
+def test_plot_tukey_test(sample_data, ax, tmp_path) -> None:
     """Test the plot_tukey_test function."""
     output_dir = tmp_path  # Temporary directory for saving the plot
-    plot_tukey_test(sample_data, "Success_Year2", "Binned_Onset_Age", output_dir)
+    endog = sample_data["Success_Year2"].to_numpy(dtype=float)
+    groups = sample_data["Binned_Onset_Age"].to_numpy()
+    tukey = plot_tukey_test(endog, groups, "Success_Year2", "Binned_Onset_Age", ax, output_dir)
+    assert len(tukey.meandiffs) == 6  # One comparison per pair of the 4 groups
     
     # Assert that the plot file is created only if there are valid results
     output_file = output_dir / "tukey_hsd_Success_Year2.png"
@@ -88,3 +221,12 @@ def test_plot_tukey_test(sample_data, tmp_path) -> None:
     else:
         print(f"No valid Tukey test results for Success_Year2.")
         assert True  # Valid scenario when there are no results
+
+# Test: analyze_year function
+def test_analyze_year() -> None:
+    """Test that analyze_year returns the rendered Tukey plot as PNG bytes."""
+    values = np.array([1, 0, 1, 1, 0, 0, 1, np.nan])
+    groups = np.array(["5 to 7", "5 to 7", "5 to 7", "Over 40", "Over 40", "Over 40", "1 to 2", "1 to 2"], dtype=object)
+    plot_bytes = analyze_year(values, groups, "Success_Year1", "Binned_Onset_Age")
+    assert plot_bytes is not None
+    assert plot_bytes.startswith(b"\x89PNG")